@@ -1,20 +1,142 @@
 import sqlite3
 import functools
-from datetime import datetime
+import atexit
+import hashlib
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger("queries")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """Returns (normalized query, short hash) with literals replaced by ? and whitespace collapsed."""
+    normalized = _WHITESPACE.sub(" ", _LITERALS.sub("?", query)).strip()
+    return normalized, hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+class QueryRecorder:
+    """Ring buffer of query timings, written out as JSON log lines by a background thread.
+
+    The calling thread only appends a tuple; fingerprinting, formatting and logging
+    happen on the flusher. Successful queries are kept with probability sample_rate,
+    while errors and queries slower than slow_ms are always kept. When the buffer is
+    full the oldest records are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, capacity=10000, flush_interval=1.0, sample_rate=1.0, slow_ms=100.0,
+                 log=logger):
+        self.buffer = deque(maxlen=capacity)
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.log = log
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, query, seconds, rows, error):
+        slow = seconds * 1000 >= self.slow_ms
+        if error is None and not slow and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((time.time(), query, seconds, rows, error, slow))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-log-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def flush(self):
+        """Writes every buffered record as one JSON log line; a record that cannot be
+        formatted or logged is skipped so it cannot stop the ones behind it."""
+        while True:
+            try:
+                entry = self.buffer.popleft()
+            except IndexError:
+                return
+            try:
+                self._write(*entry)
+            except Exception:
+                pass
+
+    def _write(self, timestamp, query, seconds, rows, error, slow):
+        normalized, digest = fingerprint(query) if isinstance(query, str) else (None, None)
+        self.log.log(logging.WARNING if slow or error else logging.INFO, json.dumps({
+            "ts": timestamp,
+            "fingerprint": digest,
+            "query": normalized,
+            "duration_ms": round(seconds * 1000, 3),
+            "rows": rows,
+            "error": error,
+            "slow": slow,
+        }, default=str))
+
+
+def _row_count(result):
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def instrument_queries(recorder=None, **options):
+    """Decorator factory timing each call and recording its query, row count and error.
+
+    options are passed to a new QueryRecorder (sample_rate, slow_ms, ...) when no
+    recorder is given.
+    """
+    recorder = recorder or QueryRecorder(**options)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            query = kwargs.get("query") if "query" in kwargs else \
+                next((arg for arg in args if isinstance(arg, str)), None)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                recorder.record(query, time.perf_counter() - start, 0, f"{type(e).__name__}: {e}")
+                raise
+            recorder.record(query, time.perf_counter() - start, _row_count(result), None)
+            return result
+        wrapper.recorder = recorder
+        return wrapper
+    return decorator
+
 
 #### decorator to log SQL queries
-def log_queries(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Extract query argument from kwargs or args
-        query = kwargs.get("query") if "query" in kwargs else (args[0] if args else None)
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if query:
-            print(f"[{timestamp}] Executing SQL Query: {query}")
-        else:
-            print(f"[{timestamp}] No SQL query found.")
-        return func(*args, **kwargs)
-    return wrapper
+log_queries = instrument_queries()
 
 
 @log_queries
@@ -1,16 +1,4 @@
-import sqlite3
-import functools
-
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            # Inject the connection as the first argument
-            return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper
+from db_pool import with_db_connection
 
 
 @with_db_connection
@@ -1,15 +1,6 @@
-import sqlite3
 import functools
 
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper
+from db_pool import with_db_connection
 
 
 def transactional(func):
@@ -1,18 +1,7 @@
 import time
-import sqlite3
 import functools
 
-
-#### with_db_connection decorator
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
-        try:
-            return func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-    return wrapper
+from db_pool import with_db_connection
 
 
 #### retry_on_failure decorator
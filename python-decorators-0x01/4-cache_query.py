@@ -1,36 +1,634 @@
 import time
 import sqlite3
 import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
 
+from db_pool import pool, with_db_connection
 
-query_cache = {}
 
-#### with_db_connection decorator
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect("users.db")
+class QueryCache:
+    """Bounded LRU cache of query results with per-entry TTL and table-level invalidation.
+
+    Entries are keyed on the query plus its parameters and remember which tables they
+    read, so a write to any of those tables drops them. Every invalidation bumps the
+    generation of the tables it hit; set() discards a result whose tables were
+    invalidated after the generation() snapshot it is given, so a read that raced a
+    write cannot re-cache the old rows.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (result, size, expires_at, tables)
+        self._keys_by_table = {}
+        self._generations = {}  # table -> generation of its last invalidation
+        self._generation = 0
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self.stale_hits = 0
+
+    def get(self, key):
+        """Returns (True, result) for a fresh entry, else (False, None)."""
+        with self._lock:
+            state, result = self._peek(key)
+            if state == 'stale':
+                self._remove(key)
+                self.expirations += 1
+            if state != 'fresh':
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, result
+
+    def lookup(self, key):
+        """Returns ('fresh' | 'stale' | 'miss', result), keeping expired entries readable."""
+        with self._lock:
+            state, result = self._peek(key)
+            if state == 'fresh':
+                self.hits += 1
+            elif state == 'stale':
+                self.stale_hits += 1
+            else:
+                self.misses += 1
+            return state, result
+
+    def _peek(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return 'miss', None
+        self._entries.move_to_end(key)
+        return ('stale' if entry[2] <= time.monotonic() else 'fresh'), entry[0]
+
+    def generation(self):
+        """Snapshot to pass to set() as since, taken before running the query."""
+        return self._generation
+
+    def set(self, key, result, tables=(), ttl=None, since=None):
+        """Stores result, evicting least recently used entries to stay within bounds."""
+        size = _approx_size(result)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tables = frozenset(tables)
+        with self._lock:
+            if since is not None and any(self._generations.get(t, 0) > since for t in tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (result, size, expires_at, tables)
+            self._bytes += size
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tables(self, tables):
+        """Drops every entry that read any of the given tables."""
+        with self._lock:
+            self._generation += 1
+            for table in tables:
+                self._generations[table.lower()] = self._generation
+                for key in self._keys_by_table.pop(table.lower(), ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale_hits': self.stale_hits,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, size, _, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+
+def _approx_size(result):
+    """Rough size in bytes of a query result (a list of row tuples or a single row)."""
+    size = sys.getsizeof(result)
+    if isinstance(result, (list, tuple)):
+        for row in result:
+            size += sys.getsizeof(row)
+            if isinstance(row, (list, tuple)):
+                size += sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+def _cache_key(args, kwargs):
+    """Hashable key for the query and bound parameters a cached function was called with."""
+    def freeze(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze(v) for v in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+        return value
+    return freeze(args), freeze(kwargs)
+
+
+_WRITE_ACTIONS = (sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE)
+
+
+def _table_tracker(reads, writes, chained=None):
+    """sqlite3 authorizer that records the tables a statement reads and writes,
+    then defers to chained (the connection's own authorizer) if there is one."""
+    def authorizer(action, arg1, arg2, db_name, trigger):
+        if arg1 and not arg1.startswith('sqlite_'):
+            if action == sqlite3.SQLITE_READ:
+                reads.add(arg1.lower())
+            elif action in _WRITE_ACTIONS:
+                writes.add(arg1.lower())
+        if chained is not None:
+            return chained(action, arg1, arg2, db_name, trigger)
+        return sqlite3.SQLITE_OK
+    return authorizer
+
+
+class WatchedConnection:
+    """sqlite3 connection wrapper that invalidates cached reads of the tables written
+    through it once those writes are committed (or rolled back).
+
+    The authorizer is re-set before every statement, which makes SQLite prepare it
+    again, so statements reused from sqlite3's statement cache are still seen.
+    Invalidating only after the commit keeps a read made while the write is pending
+    from caching the old rows past it. Other attributes pass through to the
+    connection.
+    """
+
+    def __init__(self, conn, cache=None):
+        self.connection = conn
+        self.cache = cache
+        self._authorizer = None
+        self._pending = {}  # id(cache) -> (cache, tables written in the open transaction)
+
+    def set_authorizer(self, authorizer):
+        """Chained after the write tracker on every statement run through this wrapper."""
+        self._authorizer = authorizer
+
+    def _run(self, method, *args):
+        writes = set()
+        self.connection.set_authorizer(_table_tracker(set(), writes, self._authorizer))
         try:
-            return func(conn, *args, **kwargs)
+            return method(*args)
         finally:
-            conn.close()
-    return wrapper
+            self.connection.set_authorizer(None)
+            if writes:
+                self.invalidate_after_commit(
+                    self.cache if self.cache is not None else query_cache, writes)
 
+    def invalidate_after_commit(self, cache, tables):
+        """Invalidates tables in cache now if no transaction is open, else on commit."""
+        self._pending.setdefault(id(cache), (cache, set()))[1].update(tables)
+        if not self.connection.in_transaction:
+            self._flush()
 
-#### cache_query decorator
-def cache_query(func):
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        query = kwargs.get("query") if "query" in kwargs else (args[0] if args else None)
-        if query in query_cache:
-            print(f"[CACHE HIT] Returning cached result for query: {query}")
-            return query_cache[query]
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        for cache, tables in pending.values():
+            cache.invalidate_tables(tables)
+
+    def cursor(self):
+        return _WatchedCursor(self, self.connection.cursor())
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        self.connection.commit()
+        self._flush()
+
+    def rollback(self):
+        # Reads made on this connection inside the transaction may have been cached.
+        self.connection.rollback()
+        self._flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
         else:
+            self.rollback()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+class _WatchedCursor:
+    """Cursor whose statements run through its WatchedConnection's write tracking."""
+
+    def __init__(self, watched, cursor):
+        self._watched = watched
+        self.cursor = cursor
+
+    def execute(self, sql, parameters=()):
+        self._watched._run(self.cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._watched._run(self.cursor.executemany, sql, seq_of_parameters)
+        return self
+
+    def executescript(self, script):
+        self._watched._run(self.cursor.executescript, script)
+        return self
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def watch_writes(conn, cache=None):
+    """Returns conn wrapped so every committed write through it invalidates cached
+    reads of the written tables; use the returned connection for those writes."""
+    if isinstance(conn, WatchedConnection):
+        return conn
+    return WatchedConnection(conn, cache)
+
+
+def watch_pool_writes(connection_pool, cache=None):
+    """Makes a db_pool pool hand out watched connections, so writes made through
+    with_db_connection (including @transactional commits) invalidate the cache."""
+    connection_pool.wrap = lambda conn: WatchedConnection(conn, cache)
+
+
+class SQLiteCacheBackend:
+    """Query cache kept in a shared SQLite file, so every process on the node shares hits.
+
+    Results are pickled and, above compress_min bytes, zlib-compressed. Each set is
+    one IMMEDIATE transaction, so readers never see half-written entries. The least
+    recently used entries are evicted past max_bytes. Table-level invalidation and
+    generations work as in QueryCache and are visible to every process.
+
+    Hits do not write: access times are collected in memory and written in one
+    transaction once touch_batch of them are pending, touch_interval seconds have
+    passed, or before an eviction, so LRU order is approximate between flushes.
+    """
+
+    def __init__(self, path='query_cache.db', max_bytes=64 * 1024 * 1024, ttl=300,
+                 compress_min=1024, touch_batch=256, touch_interval=5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress_min = compress_min
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self._touched = {}  # digest -> last access time not yet written
+        self._touched_since = time.monotonic()
+        self._touch_lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self.stale_hits = 0
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    compressed INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entry_tables (
+                    table_name TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (table_name, key)
+                ) WITHOUT ROWID
+            """)
+            # _delete removes by key alone, which the (table_name, key) primary key can't serve.
+            conn.execute("CREATE INDEX IF NOT EXISTS entry_tables_key ON entry_tables (key)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    table_name TEXT PRIMARY KEY,
+                    generation INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(pickle.dumps(key, protocol=4)).hexdigest()
+
+    def get(self, key):
+        """Returns (True, result) for a fresh entry, else (False, None)."""
+        state, result = self._peek(key)
+        if state == 'stale':
+            digest = self._digest(key)
+            with self._transaction() as conn:
+                # Only if still expired: another process may have just refreshed it.
+                if conn.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?",
+                                (digest, time.time())).rowcount:
+                    conn.execute("DELETE FROM entry_tables WHERE key = ?", (digest,))
+            self.expirations += 1
+        if state != 'fresh':
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, result
+
+    def lookup(self, key):
+        """Returns ('fresh' | 'stale' | 'miss', result), keeping expired entries readable."""
+        state, result = self._peek(key)
+        if state == 'fresh':
+            self.hits += 1
+        elif state == 'stale':
+            self.stale_hits += 1
+        else:
+            self.misses += 1
+        return state, result
+
+    def _peek(self, key):
+        digest = self._digest(key)
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, compressed, expires_at FROM entries WHERE key = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return 'miss', None
+        self._touch(digest, now)
+        value = pickle.loads(zlib.decompress(row[0]) if row[1] else row[0])
+        return ('stale' if row[2] <= now else 'fresh'), value
+
+    def generation(self):
+        """Snapshot to pass to set() as since, taken before running the query."""
+        return self._conn().execute(
+            "SELECT COALESCE(MAX(generation), 0) FROM generations"
+        ).fetchone()[0]
+
+    def _touch(self, digest, now):
+        with self._touch_lock:
+            self._touched[digest] = now
+            due = (len(self._touched) >= self.touch_batch
+                   or time.monotonic() - self._touched_since >= self.touch_interval)
+        if due:
+            with self._transaction() as conn:
+                self._flush_touches(conn)
+
+    def _flush_touches(self, conn):
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._touched_since = time.monotonic()
+        conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                         [(at, digest) for digest, at in touched.items()])
+
+    def set(self, key, result, tables=(), ttl=None, since=None):
+        """Stores result atomically, then evicts least recently used entries past max_bytes."""
+        value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        compressed = len(value) >= self.compress_min
+        if compressed:
+            value = zlib.compress(value)
+        if len(value) > self.max_bytes:
+            return
+        digest = self._digest(key)
+        tables = sorted({table.lower() for table in tables})
+        now = time.time()
+        with self._transaction() as conn:
+            if since is not None and tables and conn.execute(
+                "SELECT 1 FROM generations WHERE generation > ? AND table_name IN (%s)"
+                % ", ".join("?" * len(tables)), [since] + tables
+            ).fetchone():
+                return
+            self._delete(conn, [digest])
+            conn.execute(
+                "INSERT INTO entries (key, value, compressed, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, value, int(compressed), len(value),
+                 now + (self.ttl if ttl is None else ttl), now)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO entry_tables (table_name, key) VALUES (?, ?)",
+                [(table, digest) for table in tables]
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                self._flush_touches(conn)
+            while total > self.max_bytes:
+                victim, size = conn.execute(
+                    "SELECT key, size FROM entries ORDER BY last_access LIMIT 1"
+                ).fetchone()
+                self._delete(conn, [victim])
+                total -= size
+                self.evictions += 1
+
+    def invalidate_tables(self, tables):
+        """Drops every entry, from any process, that read any of the given tables."""
+        with self._transaction() as conn:
+            generation = conn.execute(
+                "SELECT COALESCE(MAX(generation), 0) + 1 FROM generations"
+            ).fetchone()[0]
+            for table in tables:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generations (table_name, generation) VALUES (?, ?)",
+                    (table.lower(), generation)
+                )
+                keys = [row[0] for row in conn.execute(
+                    "SELECT key FROM entry_tables WHERE table_name = ?", (table.lower(),)
+                )]
+                self._delete(conn, keys)
+                self.invalidations += len(keys)
+
+    def clear(self):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM entry_tables")
+
+    def stats(self):
+        entries, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'stale_hits': self.stale_hits,
+        }
+
+    def __len__(self):
+        return self.stats()['entries']
+
+    @staticmethod
+    def _delete(conn, keys):
+        for key in keys:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.execute("DELETE FROM entry_tables WHERE key = ?", (key,))
+
+
+# QUERY_CACHE_BACKEND=sqlite shares cached results between processes through a file.
+if os.getenv('QUERY_CACHE_BACKEND') == 'sqlite':
+    query_cache = SQLiteCacheBackend(os.getenv('QUERY_CACHE_PATH', 'query_cache.db'))
+else:
+    query_cache = QueryCache()
+
+# Pooled connections opened from now on invalidate query_cache when they commit writes.
+watch_pool_writes(pool)
+
+
+class _Flight:
+    """One in-progress query execution that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _is_read(query):
+    return not isinstance(query, str) or query.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+
+#### cache_query decorator
+def cache_query(func=None, *, cache=None, ttl=None, stale_while_revalidate=False):
+    """Caches results per query and parameters in cache (default query_cache).
+
+    cache may be a QueryCache or a SQLiteCacheBackend. While the call runs, SQLite's
+    authorizer reports which tables are read, which become the entry's invalidation
+    set. A call that writes is never cached and invalidates the tables it wrote, on a
+    WatchedConnection once the write is committed.
+
+    Concurrent misses for the same query and parameters share a single execution:
+    one caller runs it, the rest wait for its result or exception. With
+    stale_while_revalidate, callers arriving while an expired entry is being
+    refreshed get the stale result instead of waiting. Usable as @cache_query or
+    @cache_query(ttl=60).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(conn, *args, **kwargs):
+            store = cache if cache is not None else query_cache
+            query = kwargs.get("query") if "query" in kwargs else (args[0] if args else None)
+            if not _is_read(query):
+                return _execute(store, None, conn, args, kwargs)
+            key = (func.__module__, func.__qualname__) + _cache_key(args, kwargs)
+            if stale_while_revalidate:
+                state, result = store.lookup(key)
+            else:
+                found, result = store.get(key)
+                state = 'fresh' if found else 'miss'
+            if state == 'fresh':
+                print(f"[CACHE HIT] Returning cached result for query: {query}")
+                return result
+            flight_key = (id(store), key)
+            with _flights_lock:
+                flight = _flights.get(flight_key)
+                leader = flight is None
+                if leader:
+                    flight = _flights[flight_key] = _Flight()
+            if not leader:
+                if state == 'stale':
+                    print(f"[CACHE STALE] Returning stale result while refreshing query: {query}")
+                    return result
+                print(f"[CACHE WAIT] Sharing in-flight execution of query: {query}")
+                return flight.wait()
             print(f"[CACHE MISS] Executing query: {query}")
-            result = func(conn, *args, **kwargs)
-            query_cache[query] = result
+            try:
+                flight.result = _execute(store, key, conn, args, kwargs)
+                return flight.result
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with _flights_lock:
+                    del _flights[flight_key]
+                flight.done.set()
+
+        def _execute(store, key, conn, args, kwargs):
+            reads, writes = set(), set()
+            since = store.generation()
+            conn.set_authorizer(_table_tracker(reads, writes))
+            try:
+                result = func(conn, *args, **kwargs)
+            finally:
+                conn.set_authorizer(None)
+            if writes:
+                if isinstance(conn, WatchedConnection):
+                    # Deferred until the caller (e.g. an outer @transactional) commits.
+                    conn.invalidate_after_commit(store, writes)
+                else:
+                    # A bare connection cannot report its commit; invalidate now.
+                    store.invalidate_tables(writes)
+            elif key is not None:
+                store.set(key, result, reads, ttl, since=since)
             return result
-    return wrapper
+        return wrapper
+    return decorator(func) if func is not None else decorator
 
 
 @with_db_connection
@@ -48,3 +646,4 @@ users = fetch_users_with_cache(query="SELECT * FROM users")
 users_again = fetch_users_with_cache(query="SELECT * FROM users")
 
 print(users_again)
+print(query_cache.stats())
@@ -0,0 +1,114 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+
+DB_PATH = os.getenv("USERS_DB", "users.db")
+
+# Applied once when a connection is opened, instead of paying for defaults on every call.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class _Slot:
+    """A thread's connection; closed when the thread's local storage is released.
+
+    handle is what callers get: the connection, or wrap(connection).
+    """
+
+    def __init__(self, conn, handle):
+        self.conn = conn
+        self.handle = handle
+        self.depth = 0
+
+    def __del__(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ThreadLocalPool:
+    """Hands each thread one reusable, pre-configured sqlite3 connection per database.
+
+    wrap, if set, is applied to each newly opened connection (e.g. a
+    4-cache_query WatchedConnection) and the result is handed out instead.
+    """
+
+    def __init__(self, path=DB_PATH, pragmas=PRAGMAS, wrap=None):
+        self.path = path
+        self.pragmas = pragmas
+        self.wrap = wrap
+        self._local = threading.local()
+        self.opened = 0
+
+    def acquire(self):
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            # check_same_thread=False only so the slot can be closed when its thread dies.
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            handle = self.wrap(conn) if self.wrap is not None else conn
+            slot = self._local.slot = _Slot(conn, handle)
+            self.opened += 1
+        slot.depth += 1
+        return slot.handle
+
+    def release(self, conn):
+        """Ends a borrow; the outermost release rolls back anything left uncommitted,
+        as closing the connection used to."""
+        slot = self._local.slot
+        slot.depth -= 1
+        if slot.depth == 0 and conn.in_transaction:
+            conn.rollback()
+
+
+pool = ThreadLocalPool()
+
+
+def with_db_connection(func):
+    """Injects this thread's pooled users.db connection as the first argument."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        conn = pool.acquire()
+        try:
+            return func(conn, *args, **kwargs)
+        finally:
+            pool.release(conn)
+    return wrapper
+
+
+if __name__ == "__main__":
+    #### per-call latency of a connect/close decorator vs the pooled one
+    def unpooled(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = sqlite3.connect(DB_PATH)
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+        return wrapper
+
+    def get_user_by_id(conn, user_id):
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+        return cursor.fetchone()
+
+    calls = 5000
+    for name, decorator in (("connect per call", unpooled), ("pooled", with_db_connection)):
+        fetch = decorator(get_user_by_id)
+        fetch(user_id=1)
+        start = time.perf_counter()
+        for _ in range(calls):
+            fetch(user_id=1)
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed / calls * 1e6:.1f} us per call")
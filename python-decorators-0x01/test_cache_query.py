@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Regression tests for write invalidation in 4-cache_query.py.
+
+Runs against a scratch SQLite users database. Covers repeated (cached)
+write statements, reads made while a write is still uncommitted, and
+writes committed by a @transactional placed outside cache_query.
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+_tmp = tempfile.TemporaryDirectory()
+DB = os.path.join(_tmp.name, 'users.db')
+_conn = sqlite3.connect(DB)
+_conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+_conn.execute("INSERT INTO users VALUES (1, 'a', 'a@x', 30)")
+_conn.commit()
+_conn.close()
+os.environ['USERS_DB'] = DB
+os.environ.pop('QUERY_CACHE_BACKEND', None)
+
+db_pool = __import__('db_pool')
+cache_module = __import__('4-cache_query')
+transactional = __import__('2-transactional').transactional
+
+UPDATE = "UPDATE users SET email = ? WHERE id = ?"
+SELECT = "SELECT email FROM users WHERE id = ?"
+
+
+class TestWriteInvalidation(unittest.TestCase):
+    """Cached reads never outlive a committed write to the table they read."""
+
+    def setUp(self):
+        self.caches = [
+            cache_module.QueryCache(),
+            cache_module.SQLiteCacheBackend(os.path.join(_tmp.name, 'query_cache.db')),
+        ]
+
+    def reset(self, cache):
+        """Empties cache and puts back user 1's original email."""
+        cache.clear()
+        conn = sqlite3.connect(DB)
+        conn.execute(UPDATE, ('a@x', 1))
+        conn.commit()
+        conn.close()
+
+    def fetch(self, cache):
+        @cache_module.cache_query(cache=cache)
+        def fetch_email(conn, query, params):
+            return conn.execute(query, params).fetchone()[0]
+        reader = sqlite3.connect(DB)
+        try:
+            return fetch_email(reader, SELECT, (1,))
+        finally:
+            reader.close()
+
+    def test_repeated_statement(self):
+        """Running the same UPDATE twice invalidates both times."""
+        for cache in self.caches:
+            with self.subTest(cache=type(cache).__name__):
+                self.reset(cache)
+                writer = cache_module.watch_writes(sqlite3.connect(DB), cache)
+                for email in ('b@x', 'c@x'):
+                    self.fetch(cache)
+                    writer.execute(UPDATE, (email, 1))
+                    writer.commit()
+                    self.assertEqual(self.fetch(cache), email)
+                writer.close()
+
+    def test_read_during_uncommitted_write(self):
+        """A read cached before the commit is dropped by the commit."""
+        for cache in self.caches:
+            with self.subTest(cache=type(cache).__name__):
+                self.reset(cache)
+                writer = cache_module.watch_writes(sqlite3.connect(DB), cache)
+                writer.execute(UPDATE, ('pending@x', 1))
+                self.assertEqual(self.fetch(cache), 'a@x')
+                writer.commit()
+                self.assertEqual(self.fetch(cache), 'pending@x')
+                writer.close()
+
+    def test_transactional_outside_cache_query(self):
+        """A cache_query write committed later by @transactional invalidates on commit."""
+        for cache in self.caches:
+            with self.subTest(cache=type(cache).__name__):
+                self.reset(cache)
+                pool = db_pool.ThreadLocalPool(DB, wrap=cache_module.watch_writes)
+
+                def read_before_commit(func):
+                    def wrapper(conn, *args):
+                        result = func(conn, *args)
+                        # The write is done but not yet committed by @transactional.
+                        self.assertEqual(self.fetch(cache), 'a@x')
+                        return result
+                    return wrapper
+
+                @transactional
+                @read_before_commit
+                @cache_module.cache_query(cache=cache)
+                def update_email(conn, query, params):
+                    conn.execute(query, params)
+
+                self.fetch(cache)
+                conn = pool.acquire()
+                try:
+                    update_email(conn, UPDATE, ('t@x', 1))
+                finally:
+                    pool.release(conn)
+                self.assertEqual(self.fetch(cache), 't@x')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,24 +1,121 @@
+import json
+import os
+import time
+
+import mysql.connector
+
 seed = __import__('seed')
 
-def stream_users():
-    """Generator function that yields user data row by row from user_data table."""
-    connection = seed.connect_db()
-    if connection:
-        seed.create_database(connection)
-        connection.close()
-        print(f"connection successful")
-
-        connection = seed.connect_to_prodev()
-
-        if connection:
-            seed.create_table(connection)
-            seed.insert_data(connection, 'user_data.csv')
-            cursor = connection.cursor()
-            cursor.execute("SELECT * FROM user_data;")
-            for row in cursor:
+_CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+def stream_users(fetch_size=1000):
+    """Generator function that yields user data row by row from user_data table.
+
+    Rows are read through an unbuffered cursor fetch_size at a time, so memory stays
+    bounded by one fetch no matter how many rows the table holds.
+    """
+    seed.bootstrap('user_data.csv')
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute("SELECT * FROM user_data;")
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for row in seed.decode_rows(rows):
                 yield row
-            cursor.close()
-            connection.close()
+        cursor.close()
+
+class Checkpoint:
+    """Last user_id delivered by a resumable stream, optionally persisted to a JSON file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.last_user_id = None
+        self.delivered = 0
+        self.reread = 0
+        self.reconnects = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.last_user_id = state['last_user_id']
+            self.delivered = state.get('delivered', 0)
+
+    def save(self):
+        """Writes the checkpoint atomically so a crash never leaves a torn file."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_user_id': self.last_user_id, 'delivered': self.delivered}, f)
+        os.replace(tmp_path, self.path)
+
+def stream_users_resumable(checkpoint=None, batch_size=1000, max_retries=5, backoff=0.5,
+                           save_every=1):
+    """Generator that yields users in user_id order and survives dropped connections.
+
+    Progress is tracked in checkpoint (a Checkpoint, saved every save_every batches and
+    whenever the generator finishes, fails or is closed early).
+    After a connection error it reconnects with exponential backoff and resumes after
+    the last delivered user_id, so rows are neither skipped nor repeated.
+    checkpoint.reread counts rows that had been received but not yet delivered when
+    the connection dropped, and so were read again after reconnecting.
+    """
+    if checkpoint is None:
+        checkpoint = Checkpoint()
+    seed.bootstrap('user_data.csv')
+    try:
+        failures = 0
+        while True:
+            try:
+                with seed.pooled_connection() as connection:
+                    cursor = connection.cursor(buffered=False)
+                    if checkpoint.last_user_id is None:
+                        cursor.execute("SELECT * FROM user_data ORDER BY user_id")
+                    else:
+                        cursor.execute(
+                            "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id",
+                            (seed.user_id_to_db(checkpoint.last_user_id),)
+                        )
+                    batches = 0
+                    while True:
+                        rows = _fetch_batch(cursor, batch_size, checkpoint)
+                        if not rows:
+                            break
+                        failures = 0
+                        for row in seed.decode_rows(rows):
+                            checkpoint.last_user_id = row[0]
+                            checkpoint.delivered += 1
+                            yield row
+                        batches += 1
+                        if batches % save_every == 0:
+                            checkpoint.save()
+                    cursor.close()
+                return
+            except _CONNECTION_ERRORS as e:
+                failures += 1
+                if failures > max_retries:
+                    raise
+                checkpoint.reconnects += 1
+                delay = backoff * 2 ** (failures - 1)
+                print(f"Connection lost ({e}), resuming after {checkpoint.last_user_id} in {delay:.1f}s")
+                time.sleep(delay)
+    finally:
+        # Also on close or error mid-batch, so the file never lags what was yielded.
+        checkpoint.save()
+
+def _fetch_batch(cursor, batch_size, checkpoint):
+    rows = []
+    try:
+        while len(rows) < batch_size:
+            row = cursor.fetchone()
+            if row is None:
+                break
+            rows.append(row)
+    except _CONNECTION_ERRORS:
+        checkpoint.reread += len(rows)
+        raise
+    return rows
 
 # Expose the generator function for import
-__all__ = ['stream_users']
+__all__ = ['stream_users', 'stream_users_resumable', 'Checkpoint']
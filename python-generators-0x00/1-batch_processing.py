@@ -1,31 +1,47 @@
+import itertools
+
 seed = __import__('seed')
+prefetch = __import__('prefetch')
+columnar = __import__('columnar')
 
-def stream_users_in_batches(batch_size):
-    """Generator function that yields user data in batches from user_data table."""
-    connection = seed.connect_db()
-    if connection:
-        seed.create_database(connection)
-        connection.close()
-        print(f"connection successful")
+def stream_users_in_batches(batch_size, prefetch_depth=0, metrics=None, as_columns=False,
+                            where=None, params=()):
+    """Generator function that yields user data in batches from user_data table.
 
-        connection = seed.connect_to_prodev()
+    With prefetch_depth > 0 up to that many batches are fetched on a background thread
+    while the caller works on the current one; pass a prefetch.PrefetchMetrics as
+    metrics to see how long each side stalled. With as_columns=True each batch is a dict
+    of column arrays (see columnar.to_columns) instead of a list of tuples. where and
+    params add a parameterised WHERE clause; operators.Pipeline uses them for pushdown.
+    """
+    source = _fetch_batches(batch_size, as_columns, where, params)
+    return prefetch.prefetch(source, prefetch_depth, metrics)
 
-        if connection:
-            seed.create_table(connection)
-            seed.insert_data(connection, 'user_data.csv')
-            cursor = connection.cursor()
+def _fetch_batches(batch_size, as_columns=False, where=None, params=()):
+    seed.bootstrap('user_data.csv')
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        if where:
+            cursor.execute(f"SELECT * FROM user_data WHERE {where};", tuple(params))
+        else:
             cursor.execute("SELECT * FROM user_data;")
-            while True:
-                batch = cursor.fetchmany(batch_size)
-                if not batch:
-                    break
-                yield batch
-            cursor.close()
-            connection.close()
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            batch = seed.decode_rows(batch)
+            yield columnar.to_columns(batch) if as_columns else batch
+        cursor.close()
 
 def batch_processing(batch_size):
-    """processes each batch to filter users over the age of 25"""
-    for batch in stream_users_in_batches(batch_size):
-        for user in batch:
-            if user[3] > 25:
-                return(user)
+    """processes each batch to filter users over the age of 25, yielding every match"""
+    operators = __import__('operators')
+    pipeline = operators.Pipeline(batch_size).filter(operators.col('age') > 25)
+    yield from pipeline.rows()
+
+def report_batch_memory(batch_size, batches=10):
+    """Prints the memory held per batch as row tuples and as columns for the first batches."""
+    for rows in itertools.islice(stream_users_in_batches(batch_size), batches):
+        columns = columnar.to_columns(rows)
+        print(f"{len(rows)} rows: tuples {columnar.rows_nbytes(rows)} bytes, "
+              f"columns {columnar.columns_nbytes(columns)} bytes")
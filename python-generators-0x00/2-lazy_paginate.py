@@ -1,15 +1,26 @@
+import base64
+import json
+
 seed = __import__('seed')
+prefetch = __import__('prefetch')
 
 def paginate_users(page_size, offset):
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    connection.close()
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+        rows = seed.decode_rows(cursor.fetchall())
+        cursor.close()
     return rows
 
-def lazy_paginate(page_size):
-    """Generator function that implements the paginate_users(page_size, offset) that will only fetch the next page when needed at an offset of 0"""
+def lazy_paginate(page_size, prefetch_depth=0, metrics=None):
+    """Generator function that implements the paginate_users(page_size, offset) that will only fetch the next page when needed at an offset of 0
+
+    With prefetch_depth > 0 the next pages are fetched on a background thread while
+    the caller processes the current one (see prefetch.prefetch).
+    """
+    return prefetch.prefetch(_fetch_pages(page_size), prefetch_depth, metrics)
+
+def _fetch_pages(page_size):
     offset = 0
     while True:
         page = paginate_users(page_size, offset)
@@ -17,3 +28,45 @@ def lazy_paginate(page_size):
             break
         yield page
         offset += page_size
+
+def encode_token(last_user_id):
+    """Encodes the last user_id seen into an opaque continuation token."""
+    payload = json.dumps({'after': last_user_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+def decode_token(token):
+    """Returns the user_id a continuation token resumes after, or None for a fresh walk."""
+    if not token:
+        return None
+    return json.loads(base64.urlsafe_b64decode(token.encode()))['after']
+
+def paginate_users_after(page_size, last_user_id=None):
+    """Fetches the page of users ordered by user_id that follows last_user_id."""
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        if last_user_id is None:
+            cursor.execute("SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+        else:
+            cursor.execute(
+                "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (seed.user_id_to_db(last_user_id), page_size)
+            )
+        rows = seed.decode_rows(cursor.fetchall())
+        cursor.close()
+    return rows
+
+def lazy_paginate_keyset(page_size, token=None):
+    """Generator that seeks on the user_id primary key, yielding (page, token) pairs.
+
+    Each page costs an index seek instead of scanning past every earlier row. The
+    token yielded with a page resumes the walk right after it when passed back in.
+    """
+    last_user_id = decode_token(token)
+    while True:
+        page = paginate_users_after(page_size, last_user_id)
+        if not page:
+            break
+        last_user_id = page[-1]['user_id']
+        yield page, encode_token(last_user_id)
+        if len(page) < page_size:
+            break
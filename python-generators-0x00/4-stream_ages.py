@@ -1,31 +1,44 @@
 seed = __import__('seed')
+aggregates = __import__('aggregates')
 
 def stream_user_ages():
     """Generator function that yields user ages one by one."""
-    connection = seed.connect_db()
-    if connection:
-        seed.create_database(connection)
-        connection.close()
-        print(f"connection successful")
+    for ages in stream_user_age_batches():
+        for age in ages:
+            yield age
 
-        connection = seed.connect_to_prodev()
+def stream_user_age_batches(batch_size=1000):
+    """Generator function that yields lists of up to batch_size user ages."""
+    seed.bootstrap('user_data.csv')
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT age FROM user_data;")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+        cursor.close()
 
-        if connection:
-            seed.create_table(connection)
-            seed.insert_data(connection, 'user_data.csv')
-            cursor = connection.cursor()
-            cursor.execute("SELECT age FROM user_data;")
-            for row in cursor:
-                yield row[0]
-            cursor.close()
-            connection.close()
+def user_age_stats(batch_size=1000):
+    """Returns an aggregates.StreamStats over every user age, folded in one batch at a time."""
+    stats = aggregates.StreamStats()
+    for ages in stream_user_age_batches(batch_size):
+        stats.add_batch(ages)
+    return stats
 
-def average_user_age():
-    """Calculates and returns the average age without loading the entire dataset into memory"""
-    total_age = 0
-    count = 0
-    for age in stream_user_ages():
-        total_age += age
-        count += 1
-    return total_age / count if count > 0 else 0
-print(f"Average age of users: {average_user_age()}")
+def average_user_age(sample_fraction=None):
+    """Calculates and returns the average age without loading the entire dataset into memory
+
+    With sample_fraction the mean is estimated from about that fraction of the rows
+    (see sampling.approximate_user_age_stats for intervals and other estimates).
+    """
+    if sample_fraction is not None:
+        sampling = __import__('sampling')
+        mean = sampling.approximate_user_age_stats(sample_fraction)['mean']
+        return mean if mean is not None else 0
+    stats = user_age_stats()
+    return stats.sum / stats.count if stats.count > 0 else 0
+
+if __name__ == "__main__":
+    print(f"Average age of users: {average_user_age()}")
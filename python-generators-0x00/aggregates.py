@@ -0,0 +1,209 @@
+import bisect
+import math
+
+columnar = __import__('columnar')
+np = columnar.np
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch-style).
+
+    Values land in logarithmic buckets, so memory grows with the log of the value range
+    rather than with the count, and two sketches merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        self.count = 0
+
+    def _key(self, magnitude):
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value, weight=1):
+        if value > 0:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + weight
+        elif value < 0:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + weight
+        else:
+            self.zero += weight
+        self.count += weight
+
+    def add_batch(self, values):
+        """Adds an array of values, bucketing them in one vectorised pass when NumPy is available."""
+        if np is None:
+            for value in values:
+                self.add(value)
+            return
+        values = np.asarray(values, dtype=float)
+        for store, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if magnitudes.size:
+                keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma), return_counts=True)
+                for key, count in zip(keys.astype(int).tolist(), counts.tolist()):
+                    store[key] = store.get(key, 0) + count
+        self.zero += int(np.count_nonzero(values == 0))
+        self.count += int(values.size)
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1), or None when the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+
+class Histogram:
+    """Counts values into fixed bins given by sorted edges, plus under- and overflow."""
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)  # counts[0] underflow, counts[-1] overflow
+
+    def add(self, value, weight=1):
+        self.counts[bisect.bisect_right(self.edges, value)] += weight
+
+    def add_batch(self, values):
+        if np is None:
+            for value in values:
+                self.add(value)
+            return
+        indexes = np.searchsorted(self.edges, np.asarray(values), side='right')
+        for index, count in enumerate(np.bincount(indexes, minlength=len(self.counts)).tolist()):
+            self.counts[index] += count
+
+    def merge(self, other):
+        if other.edges != self.edges:
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    def bins(self):
+        """List of ((low, high), count) for the bounded bins."""
+        return [((low, high), count)
+                for low, high, count in zip(self.edges, self.edges[1:], self.counts[1:-1])]
+
+
+class StreamStats:
+    """One-pass, constant-memory count/sum/mean/variance/min/max/histogram/quantiles.
+
+    Feed single values with add() or whole batches with add_batch(). States built over
+    separate partitions combine exactly with merge(), so they can be computed in parallel.
+    """
+
+    def __init__(self, edges=range(0, 130, 10), relative_accuracy=0.01):
+        self.count = 0
+        self.sum = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.histogram = Histogram(edges)
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.histogram.add(value)
+        self.sketch.add(value)
+
+    def add_batch(self, values):
+        """Folds a whole batch (list, array or NumPy array) in at once."""
+        if np is not None:
+            values = np.asarray(values)
+            n = int(values.size)
+            if not n:
+                return
+            batch_sum = values.sum().item()
+            mean = batch_sum / n
+            m2 = float(((values - mean) ** 2).sum())
+            low, high = values.min().item(), values.max().item()
+        else:
+            values = list(values)
+            n = len(values)
+            if not n:
+                return
+            batch_sum = sum(values)
+            mean = batch_sum / n
+            m2 = sum((v - mean) ** 2 for v in values)
+            low, high = min(values), max(values)
+        self._combine(n, batch_sum, mean, m2, low, high)
+        self.histogram.add_batch(values)
+        self.sketch.add_batch(values)
+
+    def merge(self, other):
+        """Combines another StreamStats into this one, as if it had seen both streams."""
+        if other.count:
+            self._combine(other.count, other.sum, other.mean, other._m2, other.min, other.max)
+            self.histogram.merge(other.histogram)
+            self.sketch.merge(other.sketch)
+        return self
+
+    def _combine(self, n, total, mean, m2, low, high):
+        # Chan et al. parallel update of the running mean and sum of squares.
+        count = self.count + n
+        delta = mean - self.mean
+        self._m2 += m2 + delta * delta * self.count * n / count
+        self.mean += delta * n / count
+        self.count = count
+        self.sum += total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    @property
+    def variance(self):
+        """Population variance of the values seen so far."""
+        return self._m2 / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def result(self):
+        """Summary dict of every statistic."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.mean if self.count else 0,
+            'variance': self.variance,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'histogram': self.histogram.bins(),
+        }
@@ -0,0 +1,216 @@
+"""Async-generator versions of the user_data streams for use inside asyncio code.
+
+MySQL is read through aiomysql with an unbuffered server-side cursor. Pass
+backend='sqlite' (or set USER_DATA_BACKEND=sqlite) to read a local aiosqlite
+stand-in built by create_sqlite_standin instead.
+"""
+import asyncio
+import os
+import sqlite3
+import uuid
+
+seed = __import__('seed')
+
+SQLITE_PATH = os.getenv('USER_DATA_SQLITE', 'user_data.db')
+
+
+class AsyncUserSource:
+    """Async connection to user_data that hides the aiomysql/aiosqlite differences."""
+
+    def __init__(self, backend=None, sqlite_path=None):
+        self.backend = backend or os.getenv('USER_DATA_BACKEND', 'mysql')
+        self.sqlite_path = sqlite_path or SQLITE_PATH
+        self.connection = None
+
+    async def __aenter__(self):
+        if self.backend == 'sqlite':
+            import aiosqlite
+            self.connection = await aiosqlite.connect(self.sqlite_path)
+        else:
+            import aiomysql
+            self.connection = await aiomysql.connect(
+                user=os.getenv('MYSQL_USER'),
+                password=os.getenv('MYSQL_PASSWORD') or '',
+                host=os.getenv('MYSQL_HOST', 'localhost'),
+                unix_socket=os.getenv('MYSQL_SOCKET', '/opt/homebrew/var/mysql/mysql.sock'),
+                db=seed.database_name(),
+            )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self.backend == 'sqlite':
+            await self.connection.close()
+        else:
+            self.connection.close()
+        return False
+
+    async def fetch_batches(self, query, params=(), batch_size=1000, as_dicts=False):
+        """Async generator of row lists for a query written with %s placeholders."""
+        if self.backend == 'sqlite':
+            cursor = await self.connection.execute(query.replace('%s', '?'), params)
+        else:
+            import aiomysql
+            cursor = await self.connection.cursor(aiomysql.SSCursor)
+            await cursor.execute(query, params)
+        finished = False
+        try:
+            names = [column[0] for column in cursor.description]
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    finished = True
+                    break
+                rows = [dict(zip(names, row)) for row in rows] if as_dicts else list(rows)
+                yield seed.decode_rows(rows) if 'user_id' in names else rows
+        finally:
+            if finished or self.backend == 'sqlite':
+                await cursor.close()
+            else:
+                # SSCursor.close() reads the rest of an unfinished result, which would
+                # turn a cancelled scan into a full one; drop the connection instead,
+                # as the connection pool does with unread results.
+                self.connection.close()
+
+
+async def read_ahead(source, depth=2):
+    """Async generator that buffers up to depth items from source on a background task.
+
+    Closing or cancelling the consumer cancels the reader task and closes source.
+    """
+    if depth <= 0:
+        async for item in source:
+            yield item
+        return
+    buffer = asyncio.Queue(maxsize=depth)
+    done = object()
+
+    async def produce():
+        try:
+            async for item in source:
+                await buffer.put((item, None))
+            await buffer.put((done, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await buffer.put((done, e))
+        finally:
+            await source.aclose()
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item, error = await buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def stream_users_in_batches(batch_size, read_ahead_depth=2, backend=None):
+    """Async generator that yields user data in batches from user_data table."""
+    async with AsyncUserSource(backend) as source:
+        batches = read_ahead(source.fetch_batches(
+            "SELECT user_id, name, email, age FROM user_data", (), batch_size), read_ahead_depth)
+        try:
+            async for batch in batches:
+                yield batch
+        finally:
+            # async for does not close what it iterates; stop the reader before the
+            # connection goes away.
+            await batches.aclose()
+
+
+async def stream_users(read_ahead_depth=2, backend=None, fetch_size=1000):
+    """Async generator that yields user data row by row from user_data table."""
+    batches = stream_users_in_batches(fetch_size, read_ahead_depth, backend)
+    try:
+        async for batch in batches:
+            for row in batch:
+                yield row
+    finally:
+        await batches.aclose()
+
+
+async def lazy_paginate(page_size, read_ahead_depth=2, backend=None):
+    """Async generator of pages of user dicts, seeking on user_id between pages."""
+    async def pages(source):
+        last_user_id = None
+        while True:
+            if last_user_id is None:
+                query, params = "SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,)
+            else:
+                query = "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s"
+                key = last_user_id if source.backend == 'sqlite' else seed.user_id_to_db(last_user_id)
+                params = (key, page_size)
+            page = []
+            async for rows in source.fetch_batches(query, params, page_size, as_dicts=True):
+                page.extend(rows)
+            if not page:
+                break
+            yield page
+            if len(page) < page_size:
+                break
+            last_user_id = page[-1]['user_id']
+
+    async with AsyncUserSource(backend) as source:
+        stream = read_ahead(pages(source), read_ahead_depth)
+        try:
+            async for page in stream:
+                yield page
+        finally:
+            await stream.aclose()
+
+
+async def stream_user_ages(read_ahead_depth=2, backend=None, fetch_size=1000):
+    """Async generator that yields user ages one by one."""
+    async with AsyncUserSource(backend) as source:
+        batches = read_ahead(source.fetch_batches("SELECT age FROM user_data", (), fetch_size),
+                             read_ahead_depth)
+        try:
+            async for batch in batches:
+                for row in batch:
+                    yield row[0]
+        finally:
+            await batches.aclose()
+
+
+def create_sqlite_standin(csv_path='user_data.csv', sqlite_path=None):
+    """Builds the SQLite stand-in for user_data from the seed CSV."""
+    connection = sqlite3.connect(sqlite_path or SQLITE_PATH)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS user_data (
+            user_id CHAR(36) PRIMARY KEY,
+            name VARCHAR(255),
+            email VARCHAR(255) UNIQUE,
+            age INT
+        )
+    """)
+    connection.executemany(
+        "INSERT OR IGNORE INTO user_data (user_id, name, email, age) VALUES (?, ?, ?, ?)",
+        ((str(uuid.uuid4()), name, email, age) for name, email, age in seed.read_csv_rows(csv_path))
+    )
+    connection.commit()
+    connection.close()
+
+
+async def main(backend):
+    count = 0
+    async for _ in stream_users(backend=backend):
+        count += 1
+    pages = [len(page) async for page in lazy_paginate(100, backend=backend)]
+    ages = [age async for age in stream_user_ages(backend=backend)]
+    print(f"{count} users, {len(pages)} pages, average age {sum(ages) / max(len(ages), 1):.2f}")
+
+
+if __name__ == "__main__":
+    backend = os.getenv('USER_DATA_BACKEND', 'sqlite')
+    if backend == 'sqlite':
+        create_sqlite_standin()
+    asyncio.run(main(backend))
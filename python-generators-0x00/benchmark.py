@@ -0,0 +1,208 @@
+"""Benchmark suite for the user_data generators at realistic scale.
+
+Generates a reproducible N-row user CSV and loads only that file into a dedicated
+database (BENCH_DATABASE, default ALX_prodev_bench; user_data is emptied first) on the
+MySQL-compatible server configured by the MYSQL_* environment variables (a local
+MySQL or MariaDB works as a stand-in). It then times each generator in a fresh
+process and writes throughput, per-batch latency and peak RSS as JSON so runs can be
+compared across commits.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import resource
+import subprocess
+import sys
+import time
+
+FIRST_NAMES = ('Ada', 'Ben', 'Chloe', 'Dan', 'Eve', 'Femi', 'Grace', 'Hugo', 'Ifeoma', 'Jon',
+               'Kemi', 'Liam', 'Mia', 'Nora', 'Omar', 'Pia', 'Quinn', 'Rosa', 'Sam', 'Tolu')
+LAST_NAMES = ('Adams', 'Bello', 'Cruz', 'Diallo', 'Evans', 'Fischer', 'Garcia', 'Hughes',
+              'Ibrahim', 'Jones', 'Khan', 'Lopez', 'Mensah', 'Nguyen', 'Okafor', 'Patel')
+
+
+def generate_dataset(path, rows, random_seed=0):
+    """Writes a user_data-style CSV of `rows` users; the same seed gives the same file."""
+    rng = random.Random(random_seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(['name', 'email', 'age'])
+        for start in range(0, rows, 100000):
+            chunk = []
+            for i in range(start, min(start + 100000, rows)):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                chunk.append((f"{first} {last}", f"{first}.{last}{i}@example.com".lower(),
+                              rng.randint(18, 90)))
+            writer.writerows(chunk)
+
+
+def dataset_rows(path):
+    """Number of data lines in a generated CSV (lines after the header)."""
+    count = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            count += block.count(b'\n')
+    return max(count - 1, 0)
+
+
+def load_dataset(seed, path):
+    """Empties user_data in the current database and bulk-loads path into it."""
+    connection = seed.connect_db()
+    seed.create_database(connection)
+    connection.close()
+    with seed.pooled_connection() as connection:
+        seed.create_table(connection)
+        cursor = connection.cursor()
+        cursor.execute("TRUNCATE TABLE user_data")
+        cursor.close()
+        seed.insert_data_bulk(connection, path)
+        connection.commit()
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        rows = cursor.fetchone()[0]
+        cursor.close()
+    return rows
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _timed(batches):
+    """Drains an iterable of batches, returning rows, seconds and per-batch latencies."""
+    latencies = []
+    rows = 0
+    start = last = time.perf_counter()
+    for batch in batches:
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+        rows += len(batch)
+    return rows, time.perf_counter() - start, latencies
+
+
+def _run(name, arg):
+    if name == 'stream_users':
+        # Rows are counted without per-row latencies, which would dominate peak RSS.
+        start = time.perf_counter()
+        rows = sum(1 for _ in __import__('0-stream_users').stream_users())
+        return rows, time.perf_counter() - start, []
+    if name == 'stream_users_in_batches':
+        return _timed(__import__('1-batch_processing').stream_users_in_batches(arg))
+    if name == 'lazy_paginate':
+        return _timed(__import__('2-lazy_paginate').lazy_paginate(arg))
+    if name == 'average_user_age':
+        start = time.perf_counter()
+        stats = __import__('4-stream_ages').user_age_stats()
+        return stats.count, time.perf_counter() - start, []
+    raise ValueError(name)
+
+
+def _child(name, arg, results):
+    # The parent loaded the dataset; stop the generators' own bootstrap from loading
+    # user_data.csv into the benchmark database.
+    try:
+        __import__('seed').mark_bootstrapped('user_data.csv')
+        rows, seconds, latencies = _run(name, arg)
+    except Exception as e:
+        results.put({'benchmark': name, 'param': arg, 'error': f"{type(e).__name__}: {e}"})
+        return
+    latencies.sort()
+    results.put({
+        'benchmark': name,
+        'param': arg,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds else 0,
+        'batch_latency_p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else None,
+        'batch_latency_p99_ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+        'peak_rss_mb': _peak_rss_mb(),
+    })
+
+
+def run_benchmark(name, arg=None):
+    """Runs one benchmark in a fresh process so its peak RSS is measured in isolation.
+
+    A benchmark that raises, or whose process dies, gives a record with an 'error' key.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_child, args=(name, arg, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                # Checked once more: the record may have landed just before exit.
+                try:
+                    result = results.get(timeout=1)
+                except queue.Empty:
+                    result = {'benchmark': name, 'param': arg,
+                              'error': f"process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dataset', help="CSV to generate/reuse (default bench_users_<rows>_<seed>.csv)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--output', default='bench_results.json')
+    args = parser.parse_args()
+
+    dataset = args.dataset or f'bench_users_{args.rows}_{args.seed}.csv'
+    # Set before seed connects or any benchmark process is spawned, which inherit it.
+    os.environ['MYSQL_DATABASE'] = os.getenv('BENCH_DATABASE', 'ALX_prodev_bench')
+    seed = __import__('seed')
+    if not os.path.exists(dataset) or dataset_rows(dataset) != args.rows:
+        start = time.perf_counter()
+        generate_dataset(dataset, args.rows, args.seed)
+        print(f"Generated {args.rows} rows in {time.perf_counter() - start:.2f}s")
+    table_rows = load_dataset(seed, dataset)
+    print(f"Loaded {table_rows} rows into {seed.database_name()}.user_data")
+
+    plan = [('stream_users', None)]
+    plan += [('stream_users_in_batches', size) for size in args.batch_sizes]
+    plan += [('lazy_paginate', args.page_size), ('average_user_age', None)]
+    results = []
+    for name, arg in plan:
+        result = run_benchmark(name, arg)
+        label = f"{name}({arg if arg is not None else ''})"
+        if 'error' in result:
+            print(f"{label}: failed, {result['error']}")
+        else:
+            print(f"{label}: {result['rows_per_sec']:.0f} rows/sec, "
+                  f"peak RSS {result['peak_rss_mb']:.1f} MiB")
+        results.append(result)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': git_commit(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'dataset': dataset,
+            'database': seed.database_name(),
+            'rows': table_rows,
+            'seed': args.seed,
+            'results': results,
+        }, f, indent=2)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,46 @@
+"""Compares insert rate and on-disk size of CHAR(36) uuid4 keys and BINARY(16) uuid7 keys."""
+import argparse
+import time
+
+seed = __import__('seed')
+
+VARIANTS = (('user_data_char36', False), ('user_data_bin16', True))
+
+
+def run(table, compact_ids, rows, batch_size):
+    """Loads `rows` synthetic users into a scratch table; returns (rows/sec, data bytes, index bytes)."""
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(seed.user_data_ddl(compact_ids, table))
+        sql = f"INSERT INTO {table} (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = [(seed.new_user_id(compact_ids), f"User {i}", f"user{i}@example.com", 18 + i % 70)
+                     for i in range(offset, min(offset + batch_size, rows))]
+            cursor.executemany(sql, batch)
+            connection.commit()
+        rate = rows / (time.perf_counter() - start)
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+        cursor.execute(
+            "SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,)
+        )
+        data_length, index_length = cursor.fetchone()
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.close()
+    return rate, data_length, index_length
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    seed.bootstrap('user_data.csv')
+    for table, compact_ids in VARIANTS:
+        rate, data_length, index_length = run(table, compact_ids, args.rows, args.batch_size)
+        print(f"{table}: {rate:.0f} rows/sec, data {data_length / 2**20:.1f} MiB, "
+              f"indexes {index_length / 2**20:.1f} MiB")
@@ -0,0 +1,49 @@
+"""Compares full-table traversal time of OFFSET and keyset pagination."""
+import argparse
+import random
+import time
+
+seed = __import__('seed')
+lazy_paginator = __import__('2-lazy_paginate')
+
+
+def ensure_rows(target):
+    """Tops user_data up with synthetic users until it holds at least target rows."""
+    seed.bootstrap('user_data.csv')
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    missing = target - cursor.fetchone()[0]
+    rng = random.Random(0)
+    while missing > 0:
+        batch = []
+        for _ in range(min(missing, 10000)):
+            user_id = seed.new_user_id()
+            name = seed.user_id_to_str(user_id)
+            batch.append((user_id, f"User {name[:8]}", f"{name}@example.com", rng.randint(18, 90)))
+        missing -= seed.insert_rows_bulk(cursor, batch)
+        connection.commit()
+    cursor.close()
+    connection.close()
+
+
+def traverse(pages):
+    """Drains a page generator, returning (rows, seconds)."""
+    start = time.perf_counter()
+    rows = 0
+    for page in pages:
+        rows += len(page)
+    return rows, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    ensure_rows(args.rows)
+    rows, seconds = traverse(lazy_paginator.lazy_paginate(args.page_size))
+    print(f"offset: {rows} rows in {seconds:.2f}s ({rows / seconds:.0f} rows/sec)")
+    rows, seconds = traverse(page for page, _ in lazy_paginator.lazy_paginate_keyset(args.page_size))
+    print(f"keyset: {rows} rows in {seconds:.2f}s ({rows / seconds:.0f} rows/sec)")
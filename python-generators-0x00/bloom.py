@@ -0,0 +1,57 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings: no false negatives, tunable false positives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Kirsch-Mitzenmacher: k positions from two halves of one digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+    def expected_error_rate(self):
+        """False-positive probability at the current fill."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+def load_email_filter(connection, expected_new=0, error_rate=0.01, fetch_size=10000):
+    """Builds a BloomFilter of every email in user_data with one streaming read.
+
+    expected_new leaves room for the rows about to be loaded, which are added as
+    they are inserted.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    email_filter = BloomFilter(cursor.fetchone()[0] + expected_new, error_rate)
+    cursor.close()
+    cursor = connection.cursor(buffered=False)
+    cursor.execute("SELECT email FROM user_data")
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for (email,) in rows:
+            if email is not None:
+                # The email index is case-insensitive, so the filter holds lowercased keys.
+                email_filter.add(email.lower())
+    cursor.close()
+    return email_filter
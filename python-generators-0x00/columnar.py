@@ -0,0 +1,58 @@
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # fall back to the stdlib array module
+    np = None
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+
+def to_columns(rows):
+    """Transposes (user_id, name, email, age) rows into a dict with one array per column.
+
+    With NumPy, user_id becomes a fixed-width bytes array, age an int32 array and the
+    text columns object arrays. Without it, age is an array('i') and the rest are lists.
+    """
+    user_ids, names, emails, ages = zip(*rows) if rows else ((), (), (), ())
+    if np is None:
+        return {
+            'user_id': list(user_ids),
+            'name': list(names),
+            'email': list(emails),
+            'age': array('i', ages) if None not in ages else list(ages),
+        }
+    return {
+        'user_id': np.array([u if isinstance(u, bytes) else u.encode() for u in user_ids], dtype='S36'),
+        'name': np.array(names, dtype=object),
+        'email': np.array(emails, dtype=object),
+        'age': np.array(ages, dtype=np.int32 if None not in ages else object),
+    }
+
+
+def num_rows(columns):
+    """Number of rows held by a columnar batch."""
+    return len(columns['age'])
+
+
+def columns_nbytes(columns):
+    """Approximate bytes held by a columnar batch, including referenced string objects."""
+    total = sys.getsizeof(columns)
+    for column in columns.values():
+        if np is not None and isinstance(column, np.ndarray):
+            total += column.nbytes
+            if column.dtype == object:
+                total += sum(sys.getsizeof(value) for value in column)
+        elif isinstance(column, array):
+            total += sys.getsizeof(column)
+        else:
+            total += sys.getsizeof(column) + sum(sys.getsizeof(value) for value in column)
+    return total
+
+
+def rows_nbytes(rows):
+    """Approximate bytes held by a list of row tuples, including their values."""
+    return sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows
+    )
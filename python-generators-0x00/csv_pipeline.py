@@ -0,0 +1,183 @@
+"""Pipelined CSV loader: parallel chunk parsing feeding concurrent bulk writers."""
+import argparse
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+
+import mysql.connector
+
+seed = __import__('seed')
+
+_DEADLOCK = 1213
+
+
+def chunk_ranges(csv_path, chunk_bytes=8 << 20):
+    """Splits the file after its header line into newline-aligned [start, end) byte ranges.
+
+    Fields containing embedded newlines would be split across chunks; user_data.csv
+    has none.
+    """
+    ranges = []
+    with open(csv_path, 'rb') as f:
+        f.readline()  # Skip header
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        while start < size:
+            end = min(start + chunk_bytes, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_chunk(task):
+    """Parses and validates one byte range, returning (rows, malformed-row messages).
+
+    The range is scanned in place over a memory map of the file (seed.scan_csv).
+    """
+    csv_path, start, end = task
+    buf = seed.open_mmap(csv_path)
+    rows, messages = [], []
+    try:
+        for values, message in seed.scan_csv(buf, start, end):
+            if message:
+                messages.append(message)
+            else:
+                rows.append(values)
+    finally:
+        buf.close()
+    return rows, messages
+
+
+def _writer(batches, stats, errors):
+    try:
+        with seed.pooled_connection() as connection:
+            cursor = connection.cursor()
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                stats['inserted'] += _write_batch(connection, cursor, batch)
+            cursor.close()
+    except Exception as e:
+        errors.append(e)
+        # Keep draining so the reader never blocks on a full queue.
+        while batches.get() is not None:
+            pass
+
+
+def _write_batch(connection, cursor, batch, attempts=3):
+    for attempt in range(attempts):
+        try:
+            inserted = seed.insert_rows_bulk(cursor, batch)
+            connection.commit()
+            return inserted
+        except mysql.connector.errors.DatabaseError as e:
+            connection.rollback()
+            if e.errno != _DEADLOCK or attempt == attempts - 1:
+                raise
+
+
+def insert_data_parallel(csv_path, parse_workers=None, writers=2, batch_size=1000,
+                         chunk_bytes=8 << 20, queue_depth=8):
+    """Loads the CSV with parsing and writing overlapped, skipping emails that already exist.
+
+    Newline-aligned chunks are parsed in a process pool, at most two per worker in
+    flight so parsed rows cannot pile up while the writers are behind; validated rows
+    go through a bounded queue per writer thread, each with its own connection. Rows are routed
+    by lowercased email, matching the case-insensitive UNIQUE index, so duplicates
+    within the file keep their first occurrence, as in
+    insert_data. Malformed rows are reported in file order. Returns the same stats
+    dict as seed.insert_data_bulk.
+    """
+    start = time.perf_counter()
+    queues = [queue.Queue(maxsize=queue_depth) for _ in range(writers)]
+    stats = [{'inserted': 0} for _ in range(writers)]
+    errors = []
+    threads = [threading.Thread(target=_writer, args=(q, s, errors), daemon=True)
+               for q, s in zip(queues, stats)]
+    for thread in threads:
+        thread.start()
+    read = 0
+    pending = [[] for _ in range(writers)]
+    tasks = [(csv_path, low, high) for low, high in chunk_ranges(csv_path, chunk_bytes)]
+    # Pool.imap pulls tasks eagerly and buffers results without limit, so hand it a
+    # task only once an earlier result has been consumed.
+    slots = threading.Semaphore(2 * (parse_workers or os.cpu_count() or 1))
+    stopped = threading.Event()
+
+    def throttled():
+        for task in tasks:
+            slots.acquire()
+            if stopped.is_set():
+                return
+            yield task
+
+    try:
+        with multiprocessing.Pool(parse_workers) as pool:
+            try:
+                for rows, messages in pool.imap(parse_chunk, throttled()):
+                    slots.release()
+                    for message in messages:
+                        print(message)
+                    for name, email, age in rows:
+                        index = zlib.crc32(email.lower().encode()) % writers
+                        pending[index].append((seed.new_user_id(), name, email, age))
+                        if len(pending[index]) >= batch_size:
+                            queues[index].put(pending[index])
+                            pending[index] = []
+                    read += len(rows)
+                    if errors:
+                        break
+            finally:
+                # Unblock the pool's task feeder so the pool can shut down.
+                stopped.set()
+                slots.release(len(tasks) + 1)
+    finally:
+        for index, q in enumerate(queues):
+            if pending[index] and not errors:
+                q.put(pending[index])
+            q.put(None)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    inserted = sum(s['inserted'] for s in stats)
+    elapsed = time.perf_counter() - start
+    rate = read / elapsed if elapsed > 0 else 0
+    print(f"Loaded {read} rows ({inserted} new) in {elapsed:.2f}s, {rate:.0f} rows/sec")
+    return {'read': read, 'inserted': inserted, 'seconds': elapsed, 'rows_per_sec': rate}
+
+
+def _truncate():
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("TRUNCATE TABLE user_data")
+        cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('csv_path', nargs='?', default='user_data.csv')
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--truncate', action='store_true',
+                        help="empty user_data before each loader so both insert every row")
+    args = parser.parse_args()
+
+    seed.bootstrap(args.csv_path)
+    if args.truncate:
+        _truncate()
+    with seed.pooled_connection() as connection:
+        serial = seed.insert_data_bulk(connection, args.csv_path)
+        connection.commit()
+    if args.truncate:
+        _truncate()
+    pipelined = insert_data_parallel(args.csv_path, writers=args.writers)
+    print(f"bulk loader {serial['rows_per_sec']:.0f} rows/sec, "
+          f"pipelined loader {pipelined['rows_per_sec']:.0f} rows/sec")
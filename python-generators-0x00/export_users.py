@@ -0,0 +1,125 @@
+"""Exports user_data to Parquet, Arrow IPC or gzipped CSV with bounded memory."""
+import argparse
+import csv
+import gzip
+import multiprocessing
+import os
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only the csv.gz format is available without pyarrow
+    pa = pq = None
+
+batch_stream = __import__('1-batch_processing')
+parallel_scan = __import__('parallel_scan')
+seed = __import__('seed')
+
+FORMATS = {'.parquet': 'parquet', '.arrow': 'arrow', '.csv.gz': 'csv.gz'}
+COLUMNS = ('user_id', 'name', 'email', 'age')
+
+
+def format_for(path):
+    """Infers the export format from a file name."""
+    for suffix, fmt in FORMATS.items():
+        if path.endswith(suffix):
+            return fmt
+    raise ValueError(f"Cannot infer export format from {path}; use one of {', '.join(FORMATS)}")
+
+
+class CsvGzWriter:
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowWriter:
+    """Writes each batch as one Parquet row group or one Arrow IPC record batch."""
+
+    def __init__(self, path, fmt):
+        if pa is None:
+            raise RuntimeError(f"pyarrow is required for {fmt} export")
+        self.schema = pa.schema([('user_id', pa.string()), ('name', pa.string()),
+                                 ('email', pa.string()), ('age', pa.int32())])
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self.sink = pa.OSFile(path, 'wb')
+            self.writer = pa.ipc.new_file(self.sink, self.schema)
+
+    def write(self, rows):
+        columns = [list(column) for column in zip(*rows)]
+        batch = pa.record_batch(columns, schema=self.schema)
+        if isinstance(self.writer, pq.ParquetWriter):
+            self.writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+        if hasattr(self, 'sink'):
+            self.sink.close()
+
+
+def open_writer(path, fmt):
+    return CsvGzWriter(path) if fmt == 'csv.gz' else ArrowWriter(path, fmt)
+
+
+def export_range(task):
+    """Streams one user_id range (or the whole table) into path; returns rows written."""
+    path, fmt, batch_size, low, high, label = task
+    where, params = parallel_scan.range_clause(low, high)
+    writer = open_writer(path, fmt)
+    written = 0
+    start = time.perf_counter()
+    try:
+        for rows in batch_stream.stream_users_in_batches(batch_size, prefetch_depth=1,
+                                                         where=where, params=params):
+            writer.write(rows)
+            written += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {written} rows, {written / elapsed:.0f} rows/sec")
+    finally:
+        writer.close()
+    return written
+
+
+def export_users(path, fmt=None, batch_size=50000, workers=1):
+    """Exports user_data to path, or to path/part-NNNNN files with several workers.
+
+    Rows are streamed batch_size at a time, so memory is bounded by about two batches
+    per worker whatever the table size. Returns the number of rows written.
+    """
+    fmt = fmt or format_for(path)
+    suffix = next(s for s, f in FORMATS.items() if f == fmt)
+    seed.bootstrap('user_data.csv')
+    if workers <= 1:
+        return export_range((path, fmt, batch_size, None, None, path))
+    os.makedirs(path, exist_ok=True)
+    tasks = []
+    for index, (low, high) in enumerate(parallel_scan.partition_bounds(workers)):
+        part = os.path.join(path, f"part-{index:05d}{suffix}")
+        tasks.append((part, fmt, batch_size, low, high, part))
+    with multiprocessing.Pool(workers) as pool:
+        return sum(pool.map(export_range, tasks))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help="output file (.parquet, .arrow, .csv.gz) or directory with --workers")
+    parser.add_argument('--format', choices=sorted(FORMATS.values()))
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = export_users(args.path, args.format, args.batch_size, args.workers)
+    print(f"Exported {rows} rows in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,202 @@
+import operator
+from array import array
+
+seed = __import__('seed')
+columnar = __import__('columnar')
+batch_stream = __import__('1-batch_processing')
+np = columnar.np
+
+_OPS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '=': operator.eq,
+    '!=': operator.ne,
+}
+
+
+class Column:
+    """Names a user_data column; comparing it with a value builds a Predicate."""
+
+    def __init__(self, name):
+        if name not in columnar.USER_COLUMNS:
+            raise ValueError(f"Unknown column: {name}")
+        self.name = name
+
+    def __gt__(self, value):
+        return Predicate(self.name, '>', value)
+
+    def __ge__(self, value):
+        return Predicate(self.name, '>=', value)
+
+    def __lt__(self, value):
+        return Predicate(self.name, '<', value)
+
+    def __le__(self, value):
+        return Predicate(self.name, '<=', value)
+
+    def __eq__(self, value):
+        return Predicate(self.name, '=', value)
+
+    def __ne__(self, value):
+        return Predicate(self.name, '!=', value)
+
+    __hash__ = object.__hash__
+
+
+def col(name):
+    """Shorthand for Column(name), e.g. col('age') > 25."""
+    return Column(name)
+
+
+class Predicate:
+    """A column-vs-literal comparison, evaluated a batch at a time or rendered as SQL."""
+
+    def __init__(self, column, op, value):
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def mask(self, columns):
+        """Boolean mask over a columnar batch."""
+        values = columns[self.column]
+        compare = _OPS[self.op]
+        if np is not None:
+            return compare(np.asarray(values), self.value)
+        return [compare(v, self.value) for v in values]
+
+    def to_sql(self):
+        """Returns (clause, params) for a WHERE clause."""
+        value = seed.user_id_to_db(self.value) if self.column == 'user_id' else self.value
+        return f"{self.column} {self.op} %s", [value]
+
+    def __repr__(self):
+        return f"col({self.column!r}) {self.op} {self.value!r}"
+
+
+class And:
+    """Conjunction of predicates."""
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def __and__(self, other):
+        return And(*self.predicates, other)
+
+    def mask(self, columns):
+        masks = [p.mask(columns) for p in self.predicates]
+        if np is not None:
+            return np.logical_and.reduce(masks)
+        return [all(flags) for flags in zip(*masks)]
+
+    def to_sql(self):
+        clauses, params = [], []
+        for predicate in self.predicates:
+            clause, values = predicate.to_sql()
+            clauses.append(f"({clause})")
+            params.extend(values)
+        return " AND ".join(clauses), params
+
+
+def _pushable(predicate):
+    if isinstance(predicate, Predicate):
+        return True
+    return isinstance(predicate, And) and all(_pushable(p) for p in predicate.predicates)
+
+
+def select(columns, mask):
+    """Keeps the rows of a columnar batch where mask is true."""
+    if np is not None:
+        mask = np.asarray(mask, dtype=bool)
+        return {name: np.asarray(values)[mask] for name, values in columns.items()}
+    kept = {}
+    for name, values in columns.items():
+        picked = [v for v, keep in zip(values, mask) if keep]
+        kept[name] = array(values.typecode, picked) if isinstance(values, array) else picked
+    return kept
+
+
+def iter_rows(columns):
+    """Yields the rows of a columnar batch as tuples of plain Python values."""
+    names = list(columns)
+    if np is not None:
+        lists = [np.asarray(columns[name]).tolist() for name in names]
+    else:
+        lists = [list(columns[name]) for name in names]
+    if 'user_id' in columns:
+        index = names.index('user_id')
+        lists[index] = [u.decode() if isinstance(u, bytes) and len(u) == 36 else u
+                        for u in lists[index]]
+    return zip(*lists)
+
+
+class Pipeline:
+    """Lazily chains filter, project, map and aggregate stages over user batches.
+
+    Stages run on columnar batches from stream_users_in_batches. Column predicates
+    (col('age') > 25) placed before any map are pushed into the SQL WHERE clause;
+    everything else, including callables returning a mask, is evaluated per batch.
+    """
+
+    def __init__(self, batch_size=1000, prefetch_depth=0):
+        self.batch_size = batch_size
+        self.prefetch_depth = prefetch_depth
+        self.stages = []
+
+    def _then(self, stage):
+        pipeline = Pipeline(self.batch_size, self.prefetch_depth)
+        pipeline.stages = self.stages + [stage]
+        return pipeline
+
+    def filter(self, predicate):
+        """Keeps rows matching a Predicate or a callable mapping a batch to a mask."""
+        return self._then(('filter', predicate))
+
+    def project(self, *names):
+        """Keeps only the named columns."""
+        return self._then(('project', names))
+
+    def map(self, func):
+        """Replaces each batch with func(batch)."""
+        return self._then(('map', func))
+
+    def _split_pushdown(self):
+        pushed, remaining = [], list(self.stages)
+        while remaining and remaining[0][0] == 'filter' and _pushable(remaining[0][1]):
+            pushed.append(remaining.pop(0)[1])
+        return pushed, remaining
+
+    def batches(self):
+        """Generator of non-empty columnar batches after every stage has run."""
+        pushed, stages = self._split_pushdown()
+        where, params = And(*pushed).to_sql() if pushed else (None, ())
+        source = batch_stream.stream_users_in_batches(
+            self.batch_size, self.prefetch_depth, as_columns=True, where=where, params=params
+        )
+        for batch in source:
+            for kind, arg in stages:
+                if kind == 'filter':
+                    mask = arg.mask(batch) if hasattr(arg, 'mask') else arg(batch)
+                    batch = select(batch, mask)
+                elif kind == 'project':
+                    batch = {name: batch[name] for name in arg}
+                else:
+                    batch = arg(batch)
+            if len(next(iter(batch.values()), ())):
+                yield batch
+
+    def rows(self):
+        """Generator of matching rows as tuples, one batch evaluated at a time."""
+        for batch in self.batches():
+            yield from iter_rows(batch)
+
+    def aggregate(self, func, initial):
+        """Folds every batch into a result with func(accumulator, batch)."""
+        result = initial
+        for batch in self.batches():
+            result = func(result, batch)
+        return result
@@ -0,0 +1,128 @@
+"""Scans user_data in disjoint user_id ranges across a pool of worker processes."""
+import argparse
+import multiprocessing
+import os
+import time
+
+seed = __import__('seed')
+aggregates = __import__('aggregates')
+
+
+def partition_bounds(partitions):
+    """Splits the user_id key space into up to `partitions` [low, high) ranges of similar size.
+
+    Boundaries are the keys at evenly spaced offsets of the primary key index, all
+    picked in one walk of it, so the split follows the actual key distribution. None
+    means unbounded.
+    """
+    seed.bootstrap('user_data.csv')
+    bounds = [None]
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        total = cursor.fetchone()[0]
+        offsets = sorted({total * i // partitions for i in range(1, partitions)} - {0})
+        if offsets:
+            cursor.execute(
+                "SELECT user_id FROM (SELECT user_id, ROW_NUMBER() OVER (ORDER BY user_id) - 1 AS n "
+                f"FROM user_data) ranked WHERE n IN ({', '.join(['%s'] * len(offsets))}) ORDER BY n",
+                tuple(offsets)
+            )
+            for (user_id,) in cursor.fetchall():
+                if user_id != bounds[-1]:
+                    bounds.append(user_id)
+        cursor.close()
+    bounds.append(None)
+    return list(zip(bounds, bounds[1:]))
+
+
+def range_clause(low, high):
+    """Returns (clause, params) restricting user_id to [low, high)."""
+    clauses, params = [], []
+    if low is not None:
+        clauses.append("user_id >= %s")
+        params.append(low)
+    if high is not None:
+        clauses.append("user_id < %s")
+        params.append(high)
+    return " AND ".join(clauses) or "1 = 1", params
+
+
+def scan_partition(task):
+    """Scans one key range on this process's own connection.
+
+    Returns (matching row count, StreamStats of their ages, matching rows or None).
+    """
+    low, high, predicate, batch_size, collect_rows = task
+    where, params = range_clause(low, high)
+    if predicate is not None:
+        clause, values = predicate.to_sql()
+        where, params = f"{where} AND ({clause})", params + values
+    stats = aggregates.StreamStats()
+    rows = [] if collect_rows else None
+    matched = 0
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT * FROM user_data WHERE {where}", tuple(params))
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            matched += len(batch)
+            stats.add_batch([row[3] for row in batch])
+            if collect_rows:
+                rows.extend(seed.decode_rows(batch))
+        cursor.close()
+    return matched, stats, rows
+
+
+def parallel_scan(workers=None, predicate=None, batch_size=10000, collect_rows=False,
+                  partitions=None, bounds=None):
+    """Filters and aggregates user_data across `workers` processes and merges the results.
+
+    predicate is an operators predicate such as col('age') > 25. bounds, from
+    partition_bounds, skips computing the split here. Returns
+    (matching row count, merged StreamStats of their ages, matching rows or None), with
+    rows in user_id range order.
+    """
+    workers = workers or os.cpu_count() or 1
+    seed.bootstrap('user_data.csv')
+    tasks = [(low, high, predicate, batch_size, collect_rows)
+             for low, high in bounds or partition_bounds(partitions or workers)]
+    if workers == 1:
+        results = map(scan_partition, tasks)
+        return _merge(results, collect_rows)
+    with multiprocessing.Pool(workers) as pool:
+        return _merge(pool.imap(scan_partition, tasks), collect_rows)
+
+
+def _merge(results, collect_rows):
+    matched, stats, rows = 0, aggregates.StreamStats(), [] if collect_rows else None
+    for part_matched, part_stats, part_rows in results:
+        matched += part_matched
+        stats.merge(part_stats)
+        if collect_rows:
+            rows.extend(part_rows)
+    return matched, stats, rows
+
+
+if __name__ == "__main__":
+    operators = __import__('operators')
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--min-age', type=int, default=25)
+    args = parser.parse_args()
+
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        # The split is computed before timing, so only the scan itself is measured.
+        bounds = partition_bounds(workers)
+        start = time.perf_counter()
+        matched, stats, _ = parallel_scan(workers, operators.col('age') > args.min_age,
+                                          bounds=bounds)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"{workers} workers: {matched} users over {args.min_age}, mean age {stats.mean:.2f}, "
+              f"{seconds:.2f}s, speedup {baseline / seconds:.2f}x")
+        workers *= 2
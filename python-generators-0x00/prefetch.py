@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+
+
+class PrefetchMetrics:
+    """Counts items handed over and how long each side of a prefetch buffer waited."""
+
+    def __init__(self):
+        self.items = 0
+        self.consumer_stall = 0.0  # seconds the caller waited for the next item
+        self.producer_stall = 0.0  # seconds the fetcher waited for buffer space
+
+    def __repr__(self):
+        return (f"PrefetchMetrics(items={self.items}, consumer_stall={self.consumer_stall:.3f}s, "
+                f"producer_stall={self.producer_stall:.3f}s)")
+
+
+def prefetch(iterable, depth=2, metrics=None):
+    """Generator that yields from iterable while a background thread fetches ahead.
+
+    At most depth items are buffered, so a slow consumer holds back the fetcher.
+    Exceptions raised while fetching are re-raised in the consumer, and closing this
+    generator stops the fetcher and closes the source on the fetcher's thread.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+    if metrics is None:
+        metrics = PrefetchMetrics()
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry):
+        start = time.perf_counter()
+        try:
+            while not stop.is_set():
+                try:
+                    buffer.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            metrics.producer_stall += time.perf_counter() - start
+
+    def produce():
+        # The source is started here so all of its work, including any
+        # database connection it holds, stays on this thread.
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(('item', item)):
+                    return
+            put(('done', None))
+        except BaseException as e:
+            put(('error', e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+
+    thread = threading.Thread(target=produce, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            start = time.perf_counter()
+            kind, value = buffer.get()
+            metrics.consumer_stall += time.perf_counter() - start
+            if kind == 'done':
+                return
+            if kind == 'error':
+                raise value
+            metrics.items += 1
+            yield value
+    finally:
+        stop.set()
+        thread.join()
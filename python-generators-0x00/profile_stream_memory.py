@@ -0,0 +1,37 @@
+"""Streams user_data through stream_users and checks that RSS stays flat."""
+import argparse
+import os
+import sys
+
+benchmark_pagination = __import__('benchmark_pagination')
+stream_users = __import__('0-stream_users').stream_users
+
+
+def rss_bytes():
+    """Current resident set size of this process, read from /proc."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--fetch-size', type=int, default=1000)
+    parser.add_argument('--sample-every', type=int, default=500000)
+    parser.add_argument('--max-growth-mb', type=float, default=16)
+    args = parser.parse_args()
+
+    benchmark_pagination.ensure_rows(args.rows)
+    baseline = peak = None
+    count = 0
+    for _ in stream_users(args.fetch_size):
+        count += 1
+        if count % args.sample_every == 0:
+            rss = rss_bytes()
+            # The first sample is taken once the cursor and pool are warm.
+            baseline = baseline or rss
+            peak = max(peak or rss, rss)
+            print(f"{count} rows: RSS {rss / 2**20:.1f} MiB")
+    growth = ((peak or 0) - (baseline or 0)) / 2**20
+    print(f"Streamed {count} rows, RSS grew {growth:.1f} MiB after warm-up")
+    sys.exit(0 if growth <= args.max_growth_mb else 1)
@@ -0,0 +1,189 @@
+"""Approximate age analytics from samples of user_data, with confidence intervals."""
+import argparse
+import itertools
+import math
+import random
+import time
+import uuid
+
+seed = __import__('seed')
+
+Z95 = 1.959963984540054
+
+
+def reservoir_sample(iterable, k, rng=None):
+    """Uniform sample of k items from a stream of unknown length (Li's Algorithm L).
+
+    Returns (sample, items seen). Runs of items that cannot enter the reservoir are
+    skipped without drawing a random number for each.
+    """
+    rng = rng or random.Random()
+    iterator = iter(iterable)
+    reservoir = list(itertools.islice(iterator, k))
+    seen = len(reservoir)
+    if seen < k or k == 0:
+        return reservoir, seen + sum(1 for _ in iterator)
+    w = math.exp(math.log(rng.random()) / k)
+    while True:
+        skip = math.floor(math.log(rng.random()) / math.log(1 - w))
+        skipped = sum(1 for _ in itertools.islice(iterator, skip))
+        seen += skipped
+        if skipped < skip:
+            return reservoir, seen
+        for item in itertools.islice(iterator, 1):
+            seen += 1
+            reservoir[rng.randrange(k)] = item
+            break
+        else:
+            return reservoir, seen
+        w *= math.exp(math.log(rng.random()) / k)
+
+
+def estimate(sample, population=None, quantiles=(0.5, 0.95, 0.99), edges=range(0, 130, 10)):
+    """Estimates mean, quantiles and histogram counts from a simple random sample.
+
+    Each estimate comes with a 95% interval: a normal interval for the mean (with the
+    finite population correction when population is known), order-statistic intervals
+    for quantiles and binomial intervals for histogram bin shares. An empty sample
+    gives the same keys, with None estimates and zero histogram counts.
+    """
+    values = sorted(sample)
+    n = len(values)
+    edges = list(edges)
+    if n == 0:
+        return {
+            'sample_size': 0,
+            'population': population,
+            'mean': None,
+            'mean_ci': None,
+            'quantiles': {q: None for q in quantiles},
+            'histogram': [((low_edge, high_edge), 0, (0, 0))
+                          for low_edge, high_edge in zip(edges, edges[1:])],
+        }
+    mean = sum(values) / n
+    variance = sum((v - mean) ** 2 for v in values) / (n - 1) if n > 1 else 0.0
+    fpc = math.sqrt(max(0.0, (population - n) / (population - 1))) if population and population > 1 else 1.0
+    half_width = Z95 * math.sqrt(variance / n) * fpc
+    result = {
+        'sample_size': n,
+        'population': population,
+        'mean': mean,
+        'mean_ci': (mean - half_width, mean + half_width),
+        'quantiles': {},
+        'histogram': [],
+    }
+    for q in quantiles:
+        spread = Z95 * math.sqrt(n * q * (1 - q))
+        low = max(0, math.floor(n * q - spread))
+        high = min(n - 1, math.ceil(n * q + spread))
+        result['quantiles'][q] = (values[min(n - 1, int(n * q))], (values[low], values[high]))
+    scale = population or n
+    for low_edge, high_edge in zip(edges, edges[1:]):
+        hits = sum(1 for v in values if low_edge <= v < high_edge)
+        share = hits / n
+        spread = Z95 * math.sqrt(share * (1 - share) / n) * fpc
+        result['histogram'].append(((low_edge, high_edge), share * scale,
+                                    (max(0.0, share - spread) * scale, min(1.0, share + spread) * scale)))
+    return result
+
+
+def _table_rows(cursor):
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    return cursor.fetchone()[0]
+
+
+def sample_ages_bernoulli(fraction, random_seed=None):
+    """Keeps each row with probability fraction, filtered by RAND() on the server.
+
+    The server still visits every row (MySQL has no TABLESAMPLE), but only the sample
+    crosses the network. Returns (ages, rows read, table rows).
+    """
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        total = _table_rows(cursor)
+        if random_seed is None:
+            cursor.execute("SELECT age FROM user_data WHERE RAND() < %s", (fraction,))
+        else:
+            cursor.execute("SELECT age FROM user_data WHERE RAND(%s) < %s", (random_seed, fraction))
+        ages = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    return ages, total, total
+
+
+def sample_ages_blocks(fraction, block_rows=500, rng=None):
+    """Reads short runs of rows starting at random user_id keys.
+
+    Random uuid4 keys make each run a random slice of the table, so only about
+    fraction of the rows is read. Time-ordered BINARY(16) keys are not uniform, so
+    that layout falls back to sample_ages_bernoulli. Returns (ages, rows read, table rows).
+    """
+    if seed.COMPACT_IDS:
+        return sample_ages_bernoulli(fraction)
+    rng = rng or random.Random()
+    ages = []
+    with seed.pooled_connection() as connection:
+        cursor = connection.cursor()
+        total = _table_rows(cursor)
+        blocks = max(1, math.ceil(fraction * total / block_rows))
+        for _ in range(blocks):
+            start = str(uuid.UUID(int=rng.getrandbits(128)))
+            cursor.execute(
+                "SELECT age FROM user_data WHERE user_id >= %s ORDER BY user_id LIMIT %s",
+                (start, block_rows)
+            )
+            ages.extend(row[0] for row in cursor.fetchall())
+        cursor.close()
+    return ages, len(ages), total
+
+
+def approximate_user_age_stats(fraction=0.01, method='blocks', sample_size=10000, rng=None):
+    """Estimates user age statistics from a sample; see estimate() for the result keys.
+
+    method is 'blocks' or 'bernoulli' (sampled in the database) or 'reservoir'
+    (sample_size ages drawn while streaming every age). The result also carries
+    rows_read and fraction_read.
+    """
+    seed.bootstrap('user_data.csv')
+    if method == 'reservoir':
+        stream_ages = __import__('4-stream_ages')
+        ages, total = reservoir_sample(stream_ages.stream_user_ages(), sample_size, rng)
+        rows_read = total
+    elif method == 'bernoulli':
+        ages, rows_read, total = sample_ages_bernoulli(fraction)
+    else:
+        ages, rows_read, total = sample_ages_blocks(fraction, rng=rng)
+    ages = [age for age in ages if age is not None]
+    result = estimate(ages, population=total)
+    result['rows_read'] = rows_read
+    result['fraction_read'] = rows_read / total if total else 0
+    return result
+
+
+if __name__ == "__main__":
+    # Checks accuracy, interval coverage and speedup on synthetic ages, without a database.
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--sample-size', type=int, default=10000)
+    parser.add_argument('--trials', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    population = [min(100, max(18, int(rng.gauss(42, 14)))) for _ in range(args.rows)]
+    start = time.perf_counter()
+    exact_mean = sum(population) / len(population)
+    exact_p95 = sorted(population)[int(0.95 * len(population))]
+    exact_seconds = time.perf_counter() - start
+    covered = 0
+    start = time.perf_counter()
+    for _ in range(args.trials):
+        sample = rng.sample(population, args.sample_size)
+        result = estimate(sample, population=len(population))
+        covered += result['mean_ci'][0] <= exact_mean <= result['mean_ci'][1]
+    sample_seconds = (time.perf_counter() - start) / args.trials
+    print(f"exact mean {exact_mean:.3f}, p95 {exact_p95} in {exact_seconds:.3f}s")
+    print(f"estimate mean {result['mean']:.3f} CI {result['mean_ci'][0]:.3f}-{result['mean_ci'][1]:.3f}, "
+          f"p95 {result['quantiles'][0.95][0]} CI {result['quantiles'][0.95][1]}")
+    print(f"95% CI covered the true mean in {covered}/{args.trials} trials; "
+          f"{exact_seconds / sample_seconds:.1f}x faster reading {args.sample_size / args.rows:.2%} of rows")
+    sample, seen = reservoir_sample(iter(population), args.sample_size, rng)
+    print(f"reservoir sample of {len(sample)} from {seen} rows: mean {sum(sample) / len(sample):.3f}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for async_streams.py against the aiosqlite stand-in.
+
+Checks row counts, batch and page shapes, and that breaking out of or
+cancelling a stream stops the scan and closes its source promptly.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiosqlite  # noqa: F401  (the stand-in backend under test)
+
+async_streams = __import__('async_streams')
+
+AGES = [25, 31, 47, 52, 19, 64, 38]
+
+
+class AsyncStreamsTestCase(unittest.IsolatedAsyncioTestCase):
+    """Builds a seven-user SQLite stand-in from a temporary CSV for each test."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        csv_path = os.path.join(self.tmp.name, 'user_data.csv')
+        with open(csv_path, 'w') as f:
+            f.write('name,email,age\n')
+            for i, age in enumerate(AGES):
+                f.write(f'"User {i}","user{i}@example.com",{age}\n')
+        self.sqlite_path = os.path.join(self.tmp.name, 'user_data.db')
+        async_streams.create_sqlite_standin(csv_path, self.sqlite_path)
+        patcher = patch.object(async_streams, 'SQLITE_PATH', self.sqlite_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestStreams(AsyncStreamsTestCase):
+    """Row counts, batches and pages match the stand-in's contents."""
+
+    async def test_stream_users(self):
+        """Every user is yielded once as a (user_id, name, email, age) row."""
+        rows = [row async for row in async_streams.stream_users(backend='sqlite', fetch_size=3)]
+        self.assertEqual(len(rows), len(AGES))
+        self.assertEqual(len({row[0] for row in rows}), len(AGES))
+        self.assertEqual(sorted(row[3] for row in rows), sorted(AGES))
+
+    async def test_stream_users_in_batches(self):
+        """Batches hold batch_size rows except for the last."""
+        sizes = [len(batch) async for batch in
+                 async_streams.stream_users_in_batches(3, backend='sqlite')]
+        self.assertEqual(sizes, [3, 3, 1])
+
+    async def test_lazy_paginate(self):
+        """Pages are user dicts in user_id order with no overlap between pages."""
+        pages = [page async for page in async_streams.lazy_paginate(3, backend='sqlite')]
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        user_ids = [user['user_id'] for page in pages for user in page]
+        self.assertEqual(user_ids, sorted(set(user_ids)))
+        self.assertEqual(len(user_ids), len(AGES))
+
+    async def test_lazy_paginate_exact_multiple(self):
+        """A table that fills its last page exactly yields no empty page."""
+        pages = [page async for page in async_streams.lazy_paginate(7, backend='sqlite')]
+        self.assertEqual([len(page) for page in pages], [7])
+
+    async def test_stream_user_ages(self):
+        """Ages are yielded one by one."""
+        ages = [age async for age in async_streams.stream_user_ages(backend='sqlite', fetch_size=2)]
+        self.assertEqual(sorted(ages), sorted(AGES))
+
+
+class TestCancellation(AsyncStreamsTestCase):
+    """Stopping early ends the read-ahead task and closes the source."""
+
+    async def test_break_closes_stream(self):
+        """Breaking out after one row and closing the stream finishes promptly."""
+        stream = async_streams.stream_users(backend='sqlite', fetch_size=1)
+        async for _ in stream:
+            break
+        await asyncio.wait_for(stream.aclose(), timeout=5)
+
+    async def test_cancel_consumer(self):
+        """Cancelling a consumer blocked mid-stream raises CancelledError promptly."""
+        first_row = asyncio.Event()
+
+        async def consume():
+            async for _ in async_streams.stream_users(backend='sqlite', fetch_size=1):
+                first_row.set()
+                await asyncio.sleep(3600)
+
+        task = asyncio.create_task(consume())
+        await asyncio.wait_for(first_row.wait(), timeout=5)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=5)
+
+    async def test_read_ahead_closes_source(self):
+        """Closing the consumer cancels the reader and closes an endless source."""
+        closed = asyncio.Event()
+
+        async def endless():
+            try:
+                n = 0
+                while True:
+                    yield n
+                    n += 1
+            finally:
+                closed.set()
+
+        stream = async_streams.read_ahead(endless(), depth=2)
+        self.assertEqual(await stream.__anext__(), 0)
+        await stream.aclose()
+        self.assertTrue(closed.is_set())
+
+    async def test_unfinished_mysql_result_drops_connection(self):
+        """An unfinished server-side result closes the connection, not the cursor."""
+        cursor = MagicMock()
+        cursor.description = [('age',)]
+        cursor.execute = AsyncMock()
+        cursor.fetchmany = AsyncMock(return_value=[(30,)])
+        cursor.close = AsyncMock()
+        source = async_streams.AsyncUserSource(backend='mysql')
+        source.connection = MagicMock()
+        source.connection.cursor = AsyncMock(return_value=cursor)
+        with patch.dict(sys.modules, {'aiomysql': MagicMock()}):
+            batches = source.fetch_batches("SELECT age FROM user_data")
+            self.assertEqual(await batches.__anext__(), [(30,)])
+            await batches.aclose()
+        cursor.close.assert_not_awaited()
+        source.connection.close.assert_called_once()
+
+    async def test_finished_mysql_result_closes_cursor(self):
+        """A fully read server-side result closes just the cursor."""
+        cursor = MagicMock()
+        cursor.description = [('age',)]
+        cursor.execute = AsyncMock()
+        cursor.fetchmany = AsyncMock(side_effect=[[(30,)], []])
+        cursor.close = AsyncMock()
+        source = async_streams.AsyncUserSource(backend='mysql')
+        source.connection = MagicMock()
+        source.connection.cursor = AsyncMock(return_value=cursor)
+        with patch.dict(sys.modules, {'aiomysql': MagicMock()}):
+            batches = [rows async for rows in source.fetch_batches("SELECT age FROM user_data")]
+        self.assertEqual(batches, [[(30,)]])
+        cursor.close.assert_awaited_once()
+        source.connection.close.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()